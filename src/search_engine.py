@@ -15,32 +15,36 @@ logger = logging.getLogger(__name__)
 class HelpSearchEngine:
     """Full-text search engine using SQLite FTS5."""
 
-    def __init__(self, db_path: Path, indexer: HelpContentIndexer, force_rebuild: bool = False):
+    def __init__(self, db_path: Path | str | None, indexer: HelpContentIndexer, force_rebuild: bool = False):
         """Initialize search engine.
 
         Args:
-            db_path: Path to SQLite database file
+            db_path: Path to SQLite database file, or None/":memory:" for an
+                in-memory database (no disk I/O; index is lost on close)
             indexer: HelpContentIndexer for accessing help data
             force_rebuild: Force rebuild even if valid index exists
         """
-        self.db_path = Path(db_path)
+        self.db_path = None if db_path is None or str(db_path) == ":memory:" else Path(db_path)
+        self.in_memory = self.db_path is None
         self.indexer = indexer
 
-        # Ensure parent directory exists
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.db_path is not None:
+            # Ensure parent directory exists
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
         # Connect to database with thread safety for async MCP handlers
         # check_same_thread=False is safe because we don't use multiple concurrent writers
         # timeout=30 allows waiting for locks (important for Docker/volume mounts)
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
-        self.conn.row_factory = sqlite3.Row  # Enable column access by name
+        self.conn = self._connect()
 
         # Enable WAL mode for better concurrent access on volume mounts
-        try:
-            self.conn.execute("PRAGMA journal_mode=WAL")
-            logger.info("SQLite WAL mode enabled for better concurrent access")
-        except Exception as e:  # pragma: no cover
-            logger.warning(f"Could not enable WAL mode: {e} (continuing with default journal)")  # pragma: no cover
+        # (not applicable to in-memory databases)
+        if not self.in_memory:
+            try:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                logger.info("SQLite WAL mode enabled for better concurrent access")
+            except Exception as e:  # pragma: no cover
+                logger.warning(f"Could not enable WAL mode: {e} (continuing with default journal)")  # pragma: no cover
 
         # Determine if we need to build the index
         needs_build = force_rebuild or not self._index_exists() or self._needs_reindex()
@@ -52,6 +56,75 @@ class HelpSearchEngine:
             logger.info("Loading existing search index...")
             self._load_index()
 
+    @classmethod
+    def detect_hash_mismatch(cls, db_path: Path | str, indexer: HelpContentIndexer) -> bool:
+        """Check whether an existing index database is stale for the indexer.
+
+        Compares the XML hash stored in the database against the indexer's
+        current hash without constructing an engine (no WAL setup, no
+        rebuild on mismatch).
+
+        Args:
+            db_path: Path to an existing SQLite database file
+            indexer: HelpContentIndexer to compare against
+
+        Returns:
+            True if the stored hash is missing or differs from the current one
+        """
+        # Open read-only: a plain connect would create an empty database
+        # file as a side effect when db_path doesn't exist
+        try:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        except sqlite3.OperationalError:
+            return True
+
+        try:
+            cursor = conn.execute("""
+                SELECT name FROM sqlite_master
+                WHERE type='table' AND name='index_metadata'
+            """)
+            if not cursor.fetchone():
+                return True  # pragma: no cover
+
+            row = conn.execute("SELECT xml_hash FROM index_metadata LIMIT 1").fetchone()
+            if not row:
+                return True  # pragma: no cover
+
+            return str(row[0]) != indexer._get_xml_hash()
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection, indexer: HelpContentIndexer) -> "HelpSearchEngine":
+        """Wrap an existing connection whose database already holds a built index.
+
+        Bypasses the connect-and-build path in __init__; intended for
+        serving an index that was copied into the connection, e.g. with
+        sqlite3's backup API.
+
+        Args:
+            conn: Open connection containing the FTS5 tables
+            indexer: HelpContentIndexer for accessing help data
+
+        Returns:
+            HelpSearchEngine serving the existing index
+        """
+        engine = cls.__new__(cls)
+        engine.in_memory = True
+        engine.db_path = None
+        engine.indexer = indexer
+        engine.conn = conn
+        conn.row_factory = sqlite3.Row
+        engine._load_index()
+        return engine
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the configured database (file or in-memory)."""
+        target = ":memory:" if self.in_memory else str(self.db_path)
+        conn = sqlite3.connect(target, check_same_thread=False, timeout=30)
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        return conn
+
     def __enter__(self):
         return self
 
@@ -169,34 +242,36 @@ class HelpSearchEngine:
         """Build search index from help content with parallel text extraction."""
         start_time = time.time()
 
-        # Close any existing connection and remove lock files to ensure clean state
-        # This is critical on Docker volume mounts where file locks can persist
-        try:
-            if self.conn:
-                self.conn.close()
-                logger.info("Closed existing connection for clean rebuild")
-        except Exception as e:  # pragma: no cover
-            logger.warning(f"Error closing existing connection: {e}")  # pragma: no cover
-
-        # Remove lock/journal files that might be stale (esp. on volume mounts)
-        for lock_file in [f"{self.db_path}-wal", f"{self.db_path}-shm", f"{self.db_path}.lock"]:
+        # For file databases: close any existing connection and remove lock
+        # files to ensure clean state (critical on Docker volume mounts where
+        # file locks can persist). In-memory databases would be destroyed by a
+        # reconnect, so they keep their connection - tables are dropped below.
+        if not self.in_memory:
             try:
-                lock_path = Path(lock_file)
-                if lock_path.exists():
-                    lock_path.unlink()  # pragma: no cover
-                    logger.info(f"Removed stale lock file: {lock_file}")  # pragma: no cover
+                if self.conn:
+                    self.conn.close()
+                    logger.info("Closed existing connection for clean rebuild")
             except Exception as e:  # pragma: no cover
-                logger.warning(f"Could not remove lock file {lock_file}: {e}")  # pragma: no cover
-
-        # Reconnect with fresh connection
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
-        self.conn.row_factory = sqlite3.Row
-
-        # Enable WAL mode if not already enabled
-        try:
-            self.conn.execute("PRAGMA journal_mode=WAL")
-        except Exception as e:  # pragma: no cover
-            logger.warning(f"Could not enable WAL mode: {e}")  # pragma: no cover
+                logger.warning(f"Error closing existing connection: {e}")  # pragma: no cover
+
+            # Remove lock/journal files that might be stale (esp. on volume mounts)
+            for lock_file in [f"{self.db_path}-wal", f"{self.db_path}-shm", f"{self.db_path}.lock"]:
+                try:
+                    lock_path = Path(lock_file)
+                    if lock_path.exists():
+                        lock_path.unlink()  # pragma: no cover
+                        logger.info(f"Removed stale lock file: {lock_file}")  # pragma: no cover
+                except Exception as e:  # pragma: no cover
+                    logger.warning(f"Could not remove lock file {lock_file}: {e}")  # pragma: no cover
+
+            # Reconnect with fresh connection
+            self.conn = self._connect()
+
+            # Enable WAL mode if not already enabled
+            try:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            except Exception as e:  # pragma: no cover
+                logger.warning(f"Could not enable WAL mode: {e}")  # pragma: no cover
 
         cursor = self.conn.cursor()
         cursor.execute("PRAGMA synchronous = OFF")  # Disable sync during build
@@ -347,6 +422,60 @@ class HelpSearchEngine:
             logger.error(f"Index build failed, rolled back: {e}")
             raise
 
+    def upsert(self, page) -> None:
+        """Insert or replace a single page in the search index.
+
+        Used together with HelpContentIndexer.incremental_update() to index
+        only new or changed pages instead of rebuilding the whole FTS5 table.
+
+        Args:
+            page: The HelpPage object to (re-)index
+        """
+        row = self._extract_text_for_page(page.id, page)
+
+        self.conn.execute("DELETE FROM help_fts WHERE page_id = ?", (page.id,))
+        self.conn.execute(
+            """
+            INSERT INTO help_fts (page_id, title, content, file_path, help_id, is_section, breadcrumb_path, category)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            row,
+        )
+
+        self._refresh_metadata()
+        self.conn.commit()
+
+    def delete(self, page_id: str) -> None:
+        """Remove a page from the search index.
+
+        Counterpart to upsert() for pages that disappeared from the XML.
+        Applying removals is part of the incremental contract: upsert
+        refreshes the stored hash, so a skipped delete would leave the
+        stale row searchable with no rebuild left to purge it.
+
+        Args:
+            page_id: The ID of the page to remove
+        """
+        self.conn.execute("DELETE FROM help_fts WHERE page_id = ?", (page_id,))
+
+        self._refresh_metadata()
+        self.conn.commit()
+
+    def _refresh_metadata(self) -> None:
+        """Rewrite index_metadata from the indexer's current state.
+
+        Keeps the stored hash in sync so the next engine open doesn't
+        trigger a full rebuild for changes already applied incrementally.
+        """
+        self.conn.execute("DELETE FROM index_metadata")
+        self.conn.execute(
+            """
+            INSERT INTO index_metadata (xml_hash, indexed_at, page_count, help_id_count)
+            VALUES (?, ?, ?, ?)
+        """,
+            (self.indexer._get_xml_hash(), time.time(), len(self.indexer.pages), len(self.indexer.help_id_map)),
+        )
+
     def search(
         self, query: str, limit: int = 20, search_in_content: bool = True, category: str | None = None
     ) -> list[dict]:
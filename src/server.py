@@ -7,6 +7,7 @@ Optimized for thousands of help files with persistent indexing and fast startup.
 import logging
 import os
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -137,6 +138,29 @@ class AppContext:
     online_help_base_url: str  # Base URL for online help links
 
 
+# Fallback AppContext for callers outside an MCP request (e.g. tests or
+# embedding code): set it once and tools can be called with ctx=None.
+_app_context_var: ContextVar[AppContext | None] = ContextVar("as_help_app_context", default=None)
+
+
+def _get_app_context(ctx: Context | AppContext | None) -> AppContext:
+    """Resolve the active AppContext.
+
+    Prefers the MCP request context when a Context is provided; otherwise
+    falls back to the ContextVar set by the host process. An AppContext
+    passed directly is used as-is.
+    """
+    if isinstance(ctx, AppContext):
+        return ctx
+    if ctx is not None and hasattr(ctx, "request_context"):
+        lifespan_ctx: AppContext = ctx.request_context.lifespan_context
+        return lifespan_ctx
+    app_ctx = _app_context_var.get()
+    if app_ctx is None:
+        raise RuntimeError("No AppContext available: not inside an MCP request and no fallback context is set")
+    return app_ctx
+
+
 @asynccontextmanager
 async def app_lifespan(server: FastMCP):
     """Manage application lifecycle - load and index help content on startup."""
@@ -260,7 +284,7 @@ def search_help(
 
     You MUST call get_page_by_id to read actual content - previews are NOT enough.
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     # Handle FieldInfo objects when function called directly (not through FastMCP framework)
     # This supports both MCP tool invocation and direct test calls
@@ -326,7 +350,7 @@ def get_categories(ctx: Context) -> CategoriesResult:
 
     Each category can be explored further using browse_section(category_id).
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     categories = app_ctx.indexer.get_top_level_categories()
 
@@ -357,7 +381,7 @@ def browse_section(
     - Finding related pages within the same section
     - Understanding the organization of a topic area
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     # Get the parent section info
     parent = app_ctx.indexer.get_page_by_id(section_id)
@@ -393,7 +417,7 @@ def get_page_by_id(
 
     Don't hesitate to call this multiple times - reading 3-5 pages gives much better answers.
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     page = app_ctx.indexer.get_page_by_id(page_id)
     if not page:
@@ -447,7 +471,7 @@ def get_page_by_help_id(
     looks up the page associated with a HelpID and returns its content.
     Breadcrumb is optional - use the dedicated get_breadcrumb tool for navigation.
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     page = app_ctx.indexer.get_page_by_help_id(help_id)
     if not page:
@@ -502,7 +526,7 @@ async def get_breadcrumb(
 
     For most questions, the breadcrumb_path string in search results is sufficient.
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     breadcrumb_pages = app_ctx.indexer.get_breadcrumb(page_id)
 
@@ -524,7 +548,7 @@ async def get_help_statistics(ctx: Context) -> dict[str, int]:
     Returns counts of total pages, sections, and HelpID mappings.
     Also includes parent-child relationship statistics.
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     total_pages = len(app_ctx.indexer.pages)
     total_sections = sum(1 for p in app_ctx.indexer.pages.values() if p.is_section)
@@ -554,7 +578,7 @@ def get_help_page_resource(page_id: str, ctx: Context) -> str:
 
     Returns the plain text content of the page.
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     # Try to get plain text first (better for LLM)
     text = app_ctx.indexer.extract_plain_text(page_id)
@@ -575,7 +599,7 @@ def get_page_html(page_id: str, ctx: Context) -> str:
 
     Returns the raw HTML content from the help file.
     """
-    app_ctx: AppContext = ctx.request_context.lifespan_context
+    app_ctx: AppContext = _get_app_context(ctx)
 
     html_content = app_ctx.indexer.extract_html_content(page_id)
     if html_content:
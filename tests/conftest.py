@@ -1,64 +1,29 @@
 """Shared test fixtures and utilities."""
 
-import xml.etree.ElementTree as ET
+import base64
+import hashlib
+import os
+import pickle
+import shutil
 from unittest.mock import MagicMock
 
 import pytest
 
 from src.indexer import HelpContentIndexer, HelpPage
 
+# Prefer lxml's C-accelerated element builder for synthetic XML fixtures;
+# fall back to the stdlib so the test helpers don't hard-require lxml.
+try:
+    from lxml import etree as ET
 
-@pytest.fixture
-def temp_help_dir(tmp_path):
-    """Create temporary help directory with sample content."""
-    help_dir = tmp_path / "help"
-    help_dir.mkdir()
-
-    # Create sample pages directory
-    (help_dir / "hardware").mkdir()
-    (help_dir / "motion").mkdir()
-    (help_dir / "motion" / "mapp_motion").mkdir()
-
-    # Create sample HTML files
-    (help_dir / "index.html").write_text(
-        """
-        <html><head><title>Index</title></head>
-        <body><h1>Welcome</h1><p>This is the index page.</p></body></html>
-    """,
-        encoding="utf-8",
-    )
-
-    (help_dir / "hardware" / "x20di9371.html").write_text(
-        """
-        <html><head><title>X20DI9371</title></head>
-        <body><h1>X20DI9371</h1><p>Digital input module with 12 channels.</p></body></html>
-    """,
-        encoding="utf-8",
-    )
-
-    (help_dir / "motion" / "overview.html").write_text(
-        """
-        <html><head><title>Motion Overview</title></head>
-        <body><h1>Motion</h1><p>Motion control system overview.</p></body></html>
-    """,
-        encoding="utf-8",
-    )
-
-    (help_dir / "motion" / "mapp_motion" / "mc_br_moveabsolute.html").write_text(
-        """
-        <html><head><title>MC_BR_MoveAbsolute</title></head>
-        <body><h1>MC_BR_MoveAbsolute</h1><p>Moves axis to absolute position.</p></body></html>
-    """,
-        encoding="utf-8",
-    )
+    _HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET  # type: ignore[no-redef]
 
-    return help_dir
+    _HAVE_LXML = False
 
 
-@pytest.fixture
-def sample_xml(temp_help_dir):
-    """Create a sample brhelpcontent.xml file."""
-    xml_content = """<?xml version="1.0" encoding="UTF-8"?>
+_SAMPLE_XML_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
     <Section Id="hardware_section" Text="Hardware" File="index.html">
         <Page Id="x20di9371_page" Text="X20DI9371" File="hardware/x20di9371.html">
@@ -81,15 +46,78 @@ def sample_xml(temp_help_dir):
     </Section>
 </BrHelpContent>
 """
-    xml_path = temp_help_dir / "brhelpcontent.xml"
-    xml_path.write_text(xml_content, encoding="utf-8")
+
+
+# Sample HTML payloads, pre-encoded once at import time so fixture
+# instantiation is a plain byte write (no f-string/encode round trip).
+_INDEX_HTML = b"""
+        <html><head><title>Index</title></head>
+        <body><h1>Welcome</h1><p>This is the index page.</p></body></html>
+    """
+
+_X20DI9371_HTML = b"""
+        <html><head><title>X20DI9371</title></head>
+        <body><h1>X20DI9371</h1><p>Digital input module with 12 channels.</p></body></html>
+    """
+
+_MOTION_OVERVIEW_HTML = b"""
+        <html><head><title>Motion Overview</title></head>
+        <body><h1>Motion</h1><p>Motion control system overview.</p></body></html>
+    """
+
+_MC_BR_MOVEABSOLUTE_HTML = b"""
+        <html><head><title>MC_BR_MoveAbsolute</title></head>
+        <body><h1>MC_BR_MoveAbsolute</h1><p>Moves axis to absolute position.</p></body></html>
+    """
+
+
+def _populate_help_dir(help_dir):
+    """Write the sample HTML files into a help directory."""
+    # Create sample pages directory
+    (help_dir / "hardware").mkdir()
+    (help_dir / "motion").mkdir()
+    (help_dir / "motion" / "mapp_motion").mkdir()
+
+    # Create sample HTML files
+    (help_dir / "index.html").write_bytes(_INDEX_HTML)
+    (help_dir / "hardware" / "x20di9371.html").write_bytes(_X20DI9371_HTML)
+    (help_dir / "motion" / "overview.html").write_bytes(_MOTION_OVERVIEW_HTML)
+    (help_dir / "motion" / "mapp_motion" / "mc_br_moveabsolute.html").write_bytes(_MC_BR_MOVEABSOLUTE_HTML)
+
+
+# Content hash of the sample XML, computed once at import time; keys the
+# cross-run staging file used by _write_sample_xml.
+_SAMPLE_XML_SHA = hashlib.sha256(_SAMPLE_XML_CONTENT.encode("utf-8")).hexdigest()
+
+
+def _write_sample_xml(help_dir, tmp_path_factory=None):
+    """Write the sample brhelpcontent.xml into a help directory.
+
+    With a tmp_path_factory, the bytes are staged once in a content-hashed
+    file outside the per-run basetemp and hardlinked into the help
+    directory, so warm runs link an inode instead of rewriting the file
+    (copy fallback for filesystems without hardlinks).
+    """
+    xml_path = help_dir / "brhelpcontent.xml"
+    if tmp_path_factory is None:
+        xml_path.write_text(_SAMPLE_XML_CONTENT, encoding="utf-8")
+        return xml_path
+
+    cache_path = tmp_path_factory.getbasetemp().parent / f"samplexml-{_SAMPLE_XML_SHA}.xml"
+    if not cache_path.exists():
+        # Stage via a unique temp file + atomic rename so parallel workers
+        # can't observe a half-written cache file
+        staging = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        staging.write_text(_SAMPLE_XML_CONTENT, encoding="utf-8")
+        os.replace(staging, cache_path)
+    try:
+        os.link(cache_path, xml_path)
+    except OSError:  # pragma: no cover - e.g. cross-device or FAT volumes
+        shutil.copy(cache_path, xml_path)
     return xml_path
 
 
-@pytest.fixture
-def sample_xml_abbreviated(temp_help_dir):
-    """Create a sample brhelpcontent.xml with abbreviated tags."""
-    xml_content = """<?xml version="1.0" encoding="UTF-8"?>
+_SAMPLE_XML_ABBREVIATED_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
     <S Id="hardware_section" t="Hardware" p="index.html">
         <P Id="x20di9371_page" t="X20DI9371" p="hardware/x20di9371.html">
@@ -112,46 +140,168 @@ def sample_xml_abbreviated(temp_help_dir):
     </S>
 </BrHelpContent>
 """
-    xml_path = temp_help_dir / "brhelpcontent.xml"
-    xml_path.write_text(xml_content, encoding="utf-8")
+
+
+@pytest.fixture(scope="session")
+def temp_help_dir(tmp_path_factory):
+    """Create temporary help directory with sample content.
+
+    Session-scoped: the sample content is static, so the HTML files are
+    written once per run instead of once per test. Tests that mutate files
+    must use mutable_help_dir instead.
+    """
+    help_dir = tmp_path_factory.mktemp("help")
+    _populate_help_dir(help_dir)
+    return help_dir
+
+
+@pytest.fixture(scope="session")
+def sample_xml(temp_help_dir, tmp_path_factory):
+    """Create a sample brhelpcontent.xml file (hardlinked from a warm cache)."""
+    return _write_sample_xml(temp_help_dir, tmp_path_factory)
+
+
+@pytest.fixture(scope="session")
+def sample_xml_abbreviated(tmp_path_factory):
+    """Create a sample brhelpcontent.xml with abbreviated tags.
+
+    Uses its own help directory so it can coexist with the session-scoped
+    sample_xml (both write a file named brhelpcontent.xml).
+    """
+    help_dir = tmp_path_factory.mktemp("help_abbrev")
+    _populate_help_dir(help_dir)
+    xml_path = help_dir / "brhelpcontent.xml"
+    xml_path.write_text(_SAMPLE_XML_ABBREVIATED_CONTENT, encoding="utf-8")
     return xml_path
 
 
+@pytest.fixture(params=["full", "abbreviated"], scope="session")
+def sample_xml_any_format(request, sample_xml, sample_xml_abbreviated):
+    """The sample brhelpcontent.xml in both tag formats (parametrized).
+
+    For tests that assert format-independent parsing behavior; everything
+    else uses sample_xml directly so the suite isn't doubled.
+    """
+    return sample_xml if request.param == "full" else sample_xml_abbreviated
+
+
+@pytest.fixture(scope="session")
+def sample_xml_tree(sample_xml):
+    """Parse the sample XML once per session for tree-based indexing.
+
+    Consumers must treat the tree as read-only (parse_xml_tree does).
+    """
+    return ET.parse(str(sample_xml))
+
+
 @pytest.fixture
-def mock_indexer():
-    """Create indexer with in-memory test data (no file system)."""
-    indexer = MagicMock(spec=HelpContentIndexer)
+def mutable_help_dir(sample_xml, tmp_path):
+    """Function-scoped copy of the sample help content for tests that mutate files.
 
-    # Create sample pages
-    page1 = HelpPage(
-        id="page1", text="Test Page", file_path="test.html", is_section=False, help_id="12345", parent_id="section1"
-    )
+    Copies the session help directory into a fresh tmp_path so mutation tests
+    (rewriting brhelpcontent.xml, adding HTML files, ...) don't poison the
+    shared session fixtures. Index metadata is excluded so each copy starts
+    from a never-indexed state.
+    """
+    help_dir = tmp_path / "help"
+    shutil.copytree(sample_xml.parent, help_dir, ignore=shutil.ignore_patterns(".ashelp_metadata"))
+    return help_dir
 
-    section1 = HelpPage(id="section1", text="Test Section", file_path="section.html", is_section=True, parent_id=None)
 
-    page2 = HelpPage(id="page2", text="Child Page", file_path="child.html", is_section=False, parent_id="section1")
+# Static data for _StubIndexer, built exactly once at import time. Tests
+# never mutate the pages/breadcrumbs, only the MagicMock return values.
+_PAGE1 = HelpPage(
+    id="page1", text="Test Page", file_path="test.html", is_section=False, help_id="12345", parent_id="section1"
+)
+_SECTION1 = HelpPage(id="section1", text="Test Section", file_path="section.html", is_section=True, parent_id=None)
+_PAGE2 = HelpPage(id="page2", text="Child Page", file_path="child.html", is_section=False, parent_id="section1")
 
-    indexer.pages = {"page1": page1, "section1": section1, "page2": page2}
+_PAGES_DICT = {"page1": _PAGE1, "section1": _SECTION1, "page2": _PAGE2}
+_HELP_ID_MAP = {"12345": "page1"}
+_BREADCRUMB_CACHE = {"page1": [_SECTION1, _PAGE1], "page2": [_SECTION1, _PAGE2], "section1": [_SECTION1]}
+_BREADCRUMB_STR_CACHE = {pid: " > ".join(p.text for p in pages) for pid, pages in _BREADCRUMB_CACHE.items()}
 
-    indexer.help_id_map = {"12345": "page1"}
-    indexer._breadcrumb_cache = {"page1": [section1, page1], "page2": [section1, page2], "section1": [section1]}
 
-    indexer.get_page_by_id = lambda pid: indexer.pages.get(pid)
-    indexer.get_page_by_help_id = lambda hid: indexer.pages.get(indexer.help_id_map.get(hid))
-    indexer.get_breadcrumb = lambda pid: indexer._breadcrumb_cache.get(pid, [])
-    indexer.get_breadcrumb_string = lambda pid: " > ".join(p.text for p in indexer.get_breadcrumb(pid))
+class _StubIndexer:
+    """Hand-rolled HelpContentIndexer stand-in with in-memory test data.
 
-    return indexer
+    Cheaper than MagicMock(spec=HelpContentIndexer), which introspects the
+    whole class on every fixture instantiation. Navigation methods are plain
+    lambdas over the data; content extraction and listing methods stay
+    MagicMocks because tests configure them via .return_value.
+    """
+
+    def __init__(self):
+        self.pages = _PAGES_DICT
+        self.help_id_map = _HELP_ID_MAP
+        self._breadcrumb_cache = _BREADCRUMB_CACHE
+
+        self.get_page_by_id = lambda pid: self.pages.get(pid)
+        self.get_page_by_help_id = lambda hid: (
+            None if (page_id := self.help_id_map.get(hid)) is None else self.pages.get(page_id)
+        )
+        self.get_breadcrumb = lambda pid: self._breadcrumb_cache.get(pid, [])
+        self.get_breadcrumb_string = lambda pid: _BREADCRUMB_STR_CACHE.get(pid, "")
+
+        self.extract_plain_text = MagicMock()
+        self.extract_html_content = MagicMock()
+        self.get_top_level_categories = MagicMock()
+        self.get_section_children = MagicMock()
 
 
 @pytest.fixture
-def initialized_indexer(sample_xml):
-    """Create a fully initialized indexer with parsed content."""
-    indexer = HelpContentIndexer(sample_xml.parent)
+def mock_indexer():
+    """Create indexer with in-memory test data (no file system).
+
+    Function-scoped on purpose: tests reconfigure the MagicMock methods via
+    .return_value, so instances can't be shared across tests.
+    """
+    return _StubIndexer()
+
+
+def _load_or_parse(help_dir, config) -> HelpContentIndexer:
+    """Return a parsed HelpContentIndexer, memoized in pytest's cache.
+
+    The parsed structure (pages, HelpID map, breadcrumbs) is pickled into
+    the pytest cache keyed by the XML content hash, so repeat runs - and
+    repeat fixture calls within a run - restore it instead of re-parsing.
+    """
+    indexer = HelpContentIndexer(help_dir)
+    xml_hash = hashlib.sha256(indexer.xml_path.read_bytes()).hexdigest()
+    key = f"ashelp/indexer/{xml_hash}"
+
+    cached = config.cache.get(key, None)
+    if cached is not None:
+        state = pickle.loads(base64.b64decode(cached))
+        indexer.pages = state["pages"]
+        indexer.help_id_map = state["help_id_map"]
+        indexer._breadcrumb_cache = state["breadcrumb_cache"]
+        indexer._duplicate_ids = state["duplicate_ids"]
+        # Mirror the metadata side effect of a real parse
+        indexer._save_metadata()
+        return indexer
+
     indexer.parse_xml_structure()
+    state = {
+        "pages": indexer.pages,
+        "help_id_map": indexer.help_id_map,
+        "breadcrumb_cache": indexer._breadcrumb_cache,
+        "duplicate_ids": indexer._duplicate_ids,
+    }
+    config.cache.set(key, base64.b64encode(pickle.dumps(state)).decode("ascii"))
     return indexer
 
 
+@pytest.fixture
+def initialized_indexer(request, sample_xml):
+    """Create a fully initialized indexer with parsed content.
+
+    Backed by the hash-keyed pickle cache, so only the first call in the
+    first run after an XML change pays for the parse.
+    """
+    return _load_or_parse(sample_xml.parent, request.config)
+
+
 def create_sample_xml_string(pages: list[dict]) -> str:
     """Generate brhelpcontent.xml from page definitions.
 
@@ -193,6 +343,8 @@ def create_sample_xml_string(pages: list[dict]) -> str:
                 elem = add_element(parent_elem, page)
                 page_elements[page["id"]] = elem
 
+    if _HAVE_LXML:
+        return ET.tostring(root, encoding="unicode", pretty_print=False)
     return ET.tostring(root, encoding="unicode")
 
 
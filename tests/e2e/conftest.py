@@ -0,0 +1,145 @@
+"""Shared fixtures for end-to-end tests."""
+
+import hashlib
+import shutil
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+from filelock import FileLock
+
+from src.indexer import HelpContentIndexer
+from src.search_engine import HelpSearchEngine
+from src.server import AppContext, _app_context_var
+
+
+@dataclass
+class _ReqCtx:
+    lifespan_context: AppContext
+
+
+@dataclass
+class _Ctx:
+    """Minimal stand-in for the MCP Context passed to tool functions.
+
+    Plain attribute access instead of MagicMock's lazy child-mock
+    construction - tools only ever read ctx.request_context.lifespan_context.
+    """
+
+    request_context: Any
+
+
+def _make_ctx(app_context: AppContext) -> _Ctx:
+    """Wrap an AppContext in the context stub tools expect."""
+    return _Ctx(request_context=_ReqCtx(lifespan_context=app_context))
+
+
+def _build_help_server(help_dir, db_path):
+    """Build an indexer + search engine wrapped in an AppContext."""
+    indexer = HelpContentIndexer(help_dir)
+    indexer.parse_xml_structure()
+
+    search_engine = HelpSearchEngine(db_path, indexer, force_rebuild=True)
+
+    return AppContext(
+        indexer=indexer,
+        search_engine=search_engine,
+        as_version="4",
+        online_help_base_url="https://help.br-automation.com/#/en/4/",
+    )
+
+
+@pytest.fixture(scope="session")
+def prebuilt_search_db(sample_xml, tmp_path_factory):
+    """Provide a db_path for the session, pre-filled from a cross-session cache.
+
+    The sample XML and HTML inputs are deterministic, so the built FTS5
+    database is cached outside the per-run basetemp keyed by a hash of the
+    inputs. On a cache hit the full tokenize-and-insert pass is replaced by
+    a file copy; the cache check-and-build is guarded by a FileLock so
+    parallel workers (pytest -n) don't race on the cache file - the first
+    worker builds, the rest wait and copy.
+    """
+    help_dir = sample_xml.parent
+    hasher = hashlib.sha256(sample_xml.read_bytes())
+    for html_path in sorted(help_dir.rglob("*.html")):
+        hasher.update(html_path.read_bytes())
+    key = hasher.hexdigest()
+
+    cache_path = tmp_path_factory.getbasetemp().parent / f"helpdb-{key}.sqlite"
+    db_path = tmp_path_factory.mktemp("e2e_db") / "e2e_test.db"
+
+    with FileLock(str(cache_path) + ".lock"):
+        if not cache_path.exists():
+            indexer = HelpContentIndexer(help_dir)
+            indexer.parse_xml_structure()
+            HelpSearchEngine(db_path, indexer, force_rebuild=True).close()
+            # Persist the freshly built index for other workers / next session
+            shutil.copy(db_path, cache_path)
+        else:
+            shutil.copy(cache_path, db_path)
+
+    return db_path
+
+
+@pytest.fixture(scope="session")
+def help_server(sample_xml, prebuilt_search_db):
+    """App context with sample help content, shared across the e2e suite.
+
+    All e2e tests except the reindex test only read from the server, so the
+    XML parse and FTS5 index build are paid once per session instead of once
+    per test - and skipped entirely when the cross-session DB cache is warm.
+
+    Sets the server's fallback ContextVar, so tools resolve the AppContext
+    without any per-test mock plumbing.
+    """
+    indexer = HelpContentIndexer(sample_xml.parent)
+    indexer.parse_xml_structure()
+
+    search_engine = HelpSearchEngine(prebuilt_search_db, indexer, force_rebuild=False)
+
+    app_context = AppContext(
+        indexer=indexer,
+        search_engine=search_engine,
+        as_version="4",
+        online_help_base_url="https://help.br-automation.com/#/en/4/",
+    )
+
+    token = _app_context_var.set(app_context)
+    yield app_context
+    _app_context_var.reset(token)
+
+    search_engine.close()
+
+
+@pytest.fixture
+def isolated_search(help_server):
+    """Session help_server wrapped in a transaction that is rolled back.
+
+    Lets a test mutate the shared FTS5 database (raw SQL, no commits)
+    without a per-test engine build: everything done inside the test is
+    undone on teardown. Tests that also mutate files or indexer state
+    still need fresh_help_server.
+    """
+    engine = help_server.search_engine
+    engine.conn.execute("BEGIN")
+    yield help_server
+    engine.conn.rollback()
+
+
+@pytest.fixture
+def fresh_help_server(mutable_help_dir, tmp_path):
+    """Function-scoped app context for tests that mutate the help content.
+
+    Only mutation tests pay the per-test rebuild cost; everything else uses
+    the session-scoped help_server. The fallback ContextVar temporarily
+    points at this context and is restored on teardown.
+    """
+    db_path = tmp_path / "e2e_mutable.db"
+    app_context = _build_help_server(mutable_help_dir, db_path)
+
+    token = _app_context_var.set(app_context)
+    yield app_context
+    _app_context_var.reset(token)
+
+    app_context.search_engine.close()
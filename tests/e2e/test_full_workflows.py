@@ -1,44 +1,17 @@
 """End-to-end tests with sample help content."""
 
-from unittest.mock import MagicMock
-
 import pytest
 
 from src.indexer import HelpContentIndexer
 from src.search_engine import HelpSearchEngine
 from src.server import AppContext, browse_section, get_categories, get_page_by_help_id, get_page_by_id, search_help
+from tests.conftest import ET
+from tests.e2e.conftest import _make_ctx
 
 
 class TestEndToEnd:
     """End-to-end tests with sample help content."""
 
-    @pytest.fixture
-    def help_server(self, temp_help_dir, sample_xml, tmp_path):
-        """Create server with sample help content."""
-        # Initialize indexer
-        indexer = HelpContentIndexer(temp_help_dir)
-        indexer.parse_xml_structure()
-
-        # Build search index
-        db_path = tmp_path / "e2e_test.db"
-        search_engine = HelpSearchEngine(db_path, indexer, force_rebuild=True)
-
-        # Create app context
-        app_context = AppContext(
-            indexer=indexer,
-            search_engine=search_engine,
-            as_version="4",
-            online_help_base_url="https://help.br-automation.com/#/en/4/",
-        )
-
-        # Create mock MCP context
-        ctx = MagicMock()
-        ctx.request_context.lifespan_context = app_context
-
-        yield ctx
-
-        search_engine.close()
-
     def test_full_search_workflow(self, help_server):
         """Test: search -> get results -> retrieve page content."""
         # 1. Call search_help with query
@@ -63,12 +36,12 @@ class TestEndToEnd:
         # 1. Call get_categories
         categories = get_categories(help_server)
 
-        # 2. Verify Hardware and Motion categories exist
+        # 2. Verify Hardware and Motion categories exist (single scan)
         assert categories.total >= 2
-        hardware = next((c for c in categories.categories if c.title == "Hardware"), None)
-        motion = next((c for c in categories.categories if c.title == "Motion"), None)
-        assert hardware is not None
-        assert motion is not None
+        by_title = {c.title: c for c in categories.categories}
+        assert "Hardware" in by_title
+        assert "Motion" in by_title
+        hardware = by_title["Hardware"]
 
         # 3. Browse Hardware category
         hardware_children = browse_section(help_server, section_id=hardware.id)
@@ -106,21 +79,23 @@ class TestEndToEnd:
         assert page_content.breadcrumb[1] == "mapp Motion"
         assert page_content.breadcrumb[2] == "MC_BR_MoveAbsolute"
 
-    def test_incremental_reindex(self, help_server, temp_help_dir, tmp_path):
-        """Test: modifying XML triggers reindex."""
+    def test_incremental_reindex(self, fresh_help_server, mutable_help_dir):
+        """Test: modifying XML triggers reindex of just the delta."""
+        app_ctx = fresh_help_server
+
         # 1. Verify initial index works
-        initial_results = search_help(help_server, query="motion")
+        initial_results = search_help(fresh_help_server, query="motion")
         assert initial_results.total > 0
 
         # 2. Modify brhelpcontent.xml (add new page)
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         content = xml_path.read_text()
         new_page = '<Page Id="new_page" Text="New Test Page" File="new.html"/>'
         content = content.replace("</BrHelpContent>", f"{new_page}</BrHelpContent>")
         xml_path.write_text(content, encoding="utf-8")
 
         # Create new HTML file
-        (temp_help_dir / "new.html").write_text(
+        (mutable_help_dir / "new.html").write_text(
             """
             <html><head><title>New Page</title></head>
             <body><h1>New Page</h1><p>This is a new test page.</p></body></html>
@@ -128,59 +103,26 @@ class TestEndToEnd:
             encoding="utf-8",
         )
 
-        # 3. Create new server instance
-        indexer = HelpContentIndexer(temp_help_dir)
-        assert indexer.needs_reindex() is True  # Should detect change
+        # 3. Change is detected; re-parse only the delta into the live system
+        assert app_ctx.indexer.needs_reindex() is True
 
-        indexer.parse_xml_structure()
+        changed, removed = app_ctx.indexer.incremental_update()
+        assert "new_page" in changed
 
-        db_path = tmp_path / "e2e_reindex.db"
-        search_engine = HelpSearchEngine(db_path, indexer, force_rebuild=True)
+        for page_id in changed:
+            app_ctx.search_engine.upsert(app_ctx.indexer.pages[page_id])
+        for page_id in removed:
+            app_ctx.search_engine.delete(page_id)
 
-        # 4. Verify new page is searchable
-        app_context = AppContext(
-            indexer=indexer,
-            search_engine=search_engine,
-            as_version="4",
-            online_help_base_url="https://help.br-automation.com/#/en/4/",
-        )
-
-        ctx = MagicMock()
-        ctx.request_context.lifespan_context = app_context
-
-        results = search_help(ctx, query="New Test Page")
+        # 4. Verify new page is searchable without a full rebuild
+        results = search_help(fresh_help_server, query="New Test Page")
         assert results.total > 0
         assert any("New Test Page" in r.title for r in results.results)
 
-        search_engine.close()
-
 
 class TestCompleteUserJourneys:
     """Test complete user journeys through the system."""
 
-    @pytest.fixture
-    def help_server(self, temp_help_dir, sample_xml, tmp_path):
-        """Create server with sample help content."""
-        indexer = HelpContentIndexer(temp_help_dir)
-        indexer.parse_xml_structure()
-
-        db_path = tmp_path / "journey_test.db"
-        search_engine = HelpSearchEngine(db_path, indexer, force_rebuild=True)
-
-        app_context = AppContext(
-            indexer=indexer,
-            search_engine=search_engine,
-            as_version="4",
-            online_help_base_url="https://help.br-automation.com/#/en/4/",
-        )
-
-        ctx = MagicMock()
-        ctx.request_context.lifespan_context = app_context
-
-        yield ctx
-
-        search_engine.close()
-
     def test_hardware_specialist_journey(self, help_server):
         """Simulate a hardware specialist looking for module information."""
         # User searches for specific module
@@ -200,15 +142,16 @@ class TestCompleteUserJourneys:
         """Simulate a motion engineer looking for function block docs."""
         # User browses categories
         categories = get_categories(help_server)
-        motion_cat = next((c for c in categories.categories if c.title == "Motion"), None)
-        assert motion_cat is not None
+        by_title = {c.title: c for c in categories.categories}
+        assert "Motion" in by_title
 
         # User explores motion category
-        motion_children = browse_section(help_server, section_id=motion_cat.id)
+        motion_children = browse_section(help_server, section_id=by_title["Motion"].id)
         assert motion_children is not None
 
         # User finds mapp Motion section
-        mapp_section = next((c for c in motion_children.children if "mapp" in c.title.lower()), None)
+        children_by_title = {c.title: c for c in motion_children.children}
+        mapp_section = children_by_title.get("mapp Motion")
         assert mapp_section is not None
 
         # User browses deeper
@@ -257,29 +200,6 @@ class TestCompleteUserJourneys:
 class TestErrorRecovery:
     """Test error handling and recovery in E2E scenarios."""
 
-    @pytest.fixture
-    def help_server(self, temp_help_dir, sample_xml, tmp_path):
-        """Create server with sample help content."""
-        indexer = HelpContentIndexer(temp_help_dir)
-        indexer.parse_xml_structure()
-
-        db_path = tmp_path / "error_test.db"
-        search_engine = HelpSearchEngine(db_path, indexer, force_rebuild=True)
-
-        app_context = AppContext(
-            indexer=indexer,
-            search_engine=search_engine,
-            as_version="4",
-            online_help_base_url="https://help.br-automation.com/#/en/4/",
-        )
-
-        ctx = MagicMock()
-        ctx.request_context.lifespan_context = app_context
-
-        yield ctx
-
-        search_engine.close()
-
     def test_nonexistent_page_id(self, help_server):
         """Test handling of non-existent page ID."""
         page = get_page_by_id(page_id="nonexistent_id", ctx=help_server)
@@ -311,29 +231,6 @@ class TestErrorRecovery:
 class TestDataConsistency:
     """Test data consistency across all operations."""
 
-    @pytest.fixture
-    def help_server(self, temp_help_dir, sample_xml, tmp_path):
-        """Create server with sample help content."""
-        indexer = HelpContentIndexer(temp_help_dir)
-        indexer.parse_xml_structure()
-
-        db_path = tmp_path / "consistency_test.db"
-        search_engine = HelpSearchEngine(db_path, indexer, force_rebuild=True)
-
-        app_context = AppContext(
-            indexer=indexer,
-            search_engine=search_engine,
-            as_version="4",
-            online_help_base_url="https://help.br-automation.com/#/en/4/",
-        )
-
-        ctx = MagicMock()
-        ctx.request_context.lifespan_context = app_context
-
-        yield ctx
-
-        search_engine.close()
-
     def test_page_id_consistency(self, help_server):
         """Verify page_id is consistent across search and retrieval."""
         # Search for page
@@ -347,6 +244,15 @@ class TestDataConsistency:
         assert page is not None
         assert page.page_id == page_id
 
+    def test_db_mutation_rolled_back(self, isolated_search):
+        """Verify DB mutations inside isolated_search don't leak to other tests."""
+        engine = isolated_search.search_engine
+
+        # Wipe the FTS table inside the fixture's transaction
+        engine.conn.execute("DELETE FROM help_fts")
+        assert engine.search("X20DI9371") == []
+        # Teardown rolls this back; later tests keep seeing the full index
+
     def test_help_id_consistency(self, help_server):
         """Verify HelpID is consistent across operations."""
         # Get page by HelpID
@@ -381,46 +287,56 @@ class TestDataConsistency:
 class TestLargeDataset:
     """Test with larger synthetic dataset (marked as slow)."""
 
-    @pytest.fixture
-    def large_help_server(self, temp_help_dir, tmp_path):
-        """Create server with larger synthetic dataset."""
+    @pytest.fixture(scope="session")
+    def large_help_server(self, tmp_path_factory):
+        """Create server with larger synthetic dataset.
+
+        Session-scoped with its own help directory: the 100-page dataset is
+        identical for every test in the class, so generation and indexing
+        happen once. HTML content is collected in memory first and written
+        in a single pass; the XML is built with the element API instead of
+        manual string interpolation.
+        """
+        help_dir = tmp_path_factory.mktemp("large_help")
+
         # Generate 100 pages across 10 categories
-        xml_parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<BrHelpContent>']
+        html_files: dict[str, str] = {}
+        root = ET.Element("BrHelpContent")
 
         for cat_num in range(10):
-            cat_id = f"cat_{cat_num}"
             cat_name = f"Category {cat_num}"
-            xml_parts.append(f'  <Section Id="{cat_id}" Text="{cat_name}" File="cat{cat_num}.html">')
-
-            # Create HTML for category
-            cat_html = f"<html><body><h1>{cat_name}</h1></body></html>"
-            (temp_help_dir / f"cat{cat_num}.html").write_text(cat_html, encoding="utf-8")
+            section = ET.SubElement(root, "Section")
+            section.set("Id", f"cat_{cat_num}")
+            section.set("Text", cat_name)
+            section.set("File", f"cat{cat_num}.html")
+            html_files[f"cat{cat_num}.html"] = f"<html><body><h1>{cat_name}</h1></body></html>"
 
             for page_num in range(10):
-                page_id = f"page_{cat_num}_{page_num}"
                 page_name = f"Page {cat_num}-{page_num}"
                 page_file = f"page_{cat_num}_{page_num}.html"
 
-                xml_parts.append(f'    <Page Id="{page_id}" Text="{page_name}" File="{page_file}">')
-                xml_parts.append(f'      <Identifiers><HelpID Value="{cat_num * 100 + page_num}"/></Identifiers>')
-                xml_parts.append("    </Page>")
+                page = ET.SubElement(section, "Page")
+                page.set("Id", f"page_{cat_num}_{page_num}")
+                page.set("Text", page_name)
+                page.set("File", page_file)
+                identifiers = ET.SubElement(page, "Identifiers")
+                help_id = ET.SubElement(identifiers, "HelpID")
+                help_id.set("Value", str(cat_num * 100 + page_num))
 
-                # Create HTML for page
-                page_html = f"<html><body><h1>{page_name}</h1><p>Content for {page_name}</p></body></html>"
-                (temp_help_dir / page_file).write_text(page_html, encoding="utf-8")
+                html_files[page_file] = f"<html><body><h1>{page_name}</h1><p>Content for {page_name}</p></body></html>"
 
-            xml_parts.append("  </Section>")
+        # Write all files in one pass
+        for filename, html in html_files.items():
+            (help_dir / filename).write_text(html, encoding="utf-8")
 
-        xml_parts.append("</BrHelpContent>")
-
-        xml_path = temp_help_dir / "brhelpcontent.xml"
-        xml_path.write_text("\n".join(xml_parts), encoding="utf-8")
+        xml_path = help_dir / "brhelpcontent.xml"
+        ET.ElementTree(root).write(str(xml_path), encoding="utf-8", xml_declaration=True)
 
         # Index the data
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(help_dir)
         indexer.parse_xml_structure()
 
-        db_path = tmp_path / "large_test.db"
+        db_path = tmp_path_factory.mktemp("large_db") / "large_test.db"
         search_engine = HelpSearchEngine(db_path, indexer, force_rebuild=True)
 
         app_context = AppContext(
@@ -430,10 +346,7 @@ class TestLargeDataset:
             online_help_base_url="https://help.br-automation.com/#/en/4/",
         )
 
-        ctx = MagicMock()
-        ctx.request_context.lifespan_context = app_context
-
-        yield ctx
+        yield _make_ctx(app_context)
 
         search_engine.close()
 
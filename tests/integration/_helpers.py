@@ -0,0 +1,6 @@
+"""Small lookup helpers shared by the integration tests."""
+
+
+def by_page_id(results: list[dict]) -> dict[str, dict]:
+    """Index search results by page_id for O(1) lookups."""
+    return {r["page_id"]: r for r in results}
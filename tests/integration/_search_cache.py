@@ -0,0 +1,28 @@
+"""Query-result cache for the integration tests.
+
+The session-scoped fixtures serve identical read-only indexes, and several
+tests repeat the same query ("X20DI9371", "MC_BR_MoveAbsolute", ...).
+Routing those through do_search turns the repeats into dict lookups.
+Results are keyed by id(engine) so engines with different contents never
+share entries; perf tests and mutation tests must keep calling
+engine.search() directly.
+"""
+
+from functools import cache
+
+from src.search_engine import HelpSearchEngine
+
+# Strong references to cached engines, so an id() can't be recycled by a
+# new engine allocated at the same address after garbage collection.
+_engines: dict[int, HelpSearchEngine] = {}
+
+
+@cache
+def _cached(engine_id: int, query: str, frozen_kwargs: tuple) -> tuple:
+    return tuple(_engines[engine_id].search(query, **dict(frozen_kwargs)))
+
+
+def do_search(engine: HelpSearchEngine, query: str, **kwargs) -> list[dict]:
+    """Run engine.search(query, **kwargs), memoized per engine and query."""
+    _engines[id(engine)] = engine
+    return list(_cached(id(engine), query, tuple(sorted(kwargs.items()))))
@@ -0,0 +1,62 @@
+"""Shared fixtures for integration tests."""
+
+import sqlite3
+
+import pytest
+
+from src.search_engine import HelpSearchEngine
+from tests.conftest import _load_or_parse
+
+
+@pytest.fixture(scope="session")
+def session_indexer(request, sample_xml):
+    """Parsed indexer shared across the integration suite (cache-backed)."""
+    return _load_or_parse(sample_xml.parent, request.config)
+
+
+@pytest.fixture(scope="session")
+def fts_template_engine(session_indexer):
+    """Build the FTS5 index once per session, in an in-memory database.
+
+    Consumers clone it via _backup_engine instead of running their own
+    tokenize-and-insert pass, so the suite pays for one index build and
+    per-fixture setup is a page-level binary copy with no disk I/O.
+    """
+    engine = HelpSearchEngine(":memory:", session_indexer, force_rebuild=True)
+    # The build already merges FTS5 segments (help_fts 'optimize'); finish
+    # compacting the template so every clone starts from refreshed query
+    # planner stats and a defragmented file image
+    engine.conn.execute("PRAGMA optimize")
+    engine.conn.execute("VACUUM")
+    yield engine
+    engine.close()
+
+
+def _backup_engine(template_engine: HelpSearchEngine) -> HelpSearchEngine:
+    """Clone the template database into a fresh in-memory engine."""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    template_engine.conn.backup(conn)
+    return HelpSearchEngine.from_connection(conn, template_engine.indexer)
+
+
+@pytest.fixture(scope="session")
+def shared_engine(fts_template_engine):
+    """Single read-only engine shared by the whole integration suite.
+
+    Cloned once from the template so tests reuse one connection (and its
+    warm page cache) instead of each opening their own. query_only makes
+    the sharing race-free; the cache/mmap pragmas size it for repeated
+    BM25 walks. Tests that mutate the index must build their own engine.
+    """
+    engine = _backup_engine(fts_template_engine)
+    engine.conn.execute("PRAGMA query_only = 1")
+    engine.conn.execute("PRAGMA cache_size = -65536")
+    engine.conn.execute("PRAGMA mmap_size = 268435456")
+    yield engine
+    engine.close()
+
+
+@pytest.fixture(scope="session")
+def help_system(session_indexer, shared_engine):
+    """Indexer + shared search engine pair used across the integration suite."""
+    return session_indexer, shared_engine
@@ -2,15 +2,18 @@
 
 import json
 
-from src.indexer import HelpContentIndexer
+import pytest
+from defusedxml import DTDForbidden
+
+from src.indexer import _PARSE_ERRORS, HelpContentIndexer
 
 
 class TestXMLAttributeExtraction:
     """Test XML attribute extraction for both full and abbreviated formats."""
 
-    def test_process_section_full_format(self, temp_help_dir, sample_xml):
-        """Verify _process_section handles full XML attribute format."""
-        indexer = HelpContentIndexer(temp_help_dir)
+    def test_process_section_formats(self, sample_xml_any_format):
+        """Verify section parsing handles full and abbreviated attribute formats."""
+        indexer = HelpContentIndexer(sample_xml_any_format.parent)
         indexer.parse_xml_structure()
 
         # Check that hardware section was parsed
@@ -20,9 +23,9 @@ class TestXMLAttributeExtraction:
         assert section.file_path == "index.html"
         assert section.is_section is True
 
-    def test_process_page_full_format(self, temp_help_dir, sample_xml):
-        """Verify _process_page handles full XML attribute format."""
-        indexer = HelpContentIndexer(temp_help_dir)
+    def test_process_page_formats(self, sample_xml_any_format):
+        """Verify page parsing handles full and abbreviated attribute formats."""
+        indexer = HelpContentIndexer(sample_xml_any_format.parent)
         indexer.parse_xml_structure()
 
         # Check that x20 page was parsed
@@ -33,52 +36,73 @@ class TestXMLAttributeExtraction:
         assert page.is_section is False
         assert page.parent_id == "hardware_section"
 
-    def test_process_section_abbreviated_format(self, temp_help_dir, sample_xml_abbreviated):
-        """Verify _process_section handles abbreviated XML format."""
-        indexer = HelpContentIndexer(temp_help_dir)
-        indexer.parse_xml_structure()
 
-        # Check that hardware section was parsed with abbreviated tags
-        assert "hardware_section" in indexer.pages
-        section = indexer.pages["hardware_section"]
-        assert section.text == "Hardware"
-        assert section.file_path == "index.html"
-        assert section.is_section is True
+class TestParseXmlTree:
+    """Test parsing from a pre-parsed element tree."""
+
+    def test_parse_xml_tree_matches_disk_parse(self, temp_help_dir, sample_xml, sample_xml_tree):
+        """Verify parse_xml_tree yields the same structure as parse_xml_structure."""
+        from_disk = HelpContentIndexer(temp_help_dir)
+        from_disk.parse_xml_structure()
+
+        from_tree = HelpContentIndexer(temp_help_dir)
+        from_tree.parse_xml_tree(sample_xml_tree)
+
+        assert from_tree.pages.keys() == from_disk.pages.keys()
+        assert from_tree.help_id_map == from_disk.help_id_map
+        for page_id, page in from_tree.pages.items():
+            assert page.parent_id == from_disk.pages[page_id].parent_id
+
+    def test_parse_xml_tree_accepts_stdlib_tree(self, temp_help_dir, sample_xml):
+        """Verify a stdlib ElementTree works (not just lxml trees)."""
+        import xml.etree.ElementTree as StdlibET
 
-    def test_process_page_abbreviated_format(self, temp_help_dir, sample_xml_abbreviated):
-        """Verify _process_page handles abbreviated XML format."""
         indexer = HelpContentIndexer(temp_help_dir)
-        indexer.parse_xml_structure()
+        indexer.parse_xml_tree(StdlibET.parse(sample_xml))
 
-        # Check that x20 page was parsed with abbreviated tags
         assert "x20di9371_page" in indexer.pages
-        page = indexer.pages["x20di9371_page"]
-        assert page.text == "X20DI9371"
-        assert page.file_path == "hardware/x20di9371.html"
-        assert page.is_section is False
+        assert indexer.help_id_map["12345"] == "x20di9371_page"
+
+
+class TestXMLHardening:
+    """Test parser hardening against hostile or malformed XML."""
+
+    def test_dtd_rejected(self, mutable_help_dir):
+        """Verify a brhelpcontent.xml carrying a DTD is refused outright."""
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
+        content = xml_path.read_text()
+        doctype = '<!DOCTYPE BrHelpContent [<!ENTITY boom "expanded">]>'
+        xml_path.write_text(content.replace("?>", f"?>\n{doctype}", 1), encoding="utf-8")
+
+        indexer = HelpContentIndexer(mutable_help_dir)
+        with pytest.raises(DTDForbidden):
+            indexer.parse_xml_structure()
+
+        assert indexer.pages == {}
+
+    def test_truncated_xml_raises(self, mutable_help_dir):
+        """Verify malformed XML raises instead of indexing a partial tree."""
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
+        content = xml_path.read_text()
+        xml_path.write_text(content[: len(content) // 2], encoding="utf-8")
+
+        indexer = HelpContentIndexer(mutable_help_dir)
+        with pytest.raises(_PARSE_ERRORS):
+            indexer.parse_xml_structure()
 
 
 class TestHelpIDExtraction:
     """Test HelpID extraction from XML."""
 
-    def test_help_id_extraction_full_format(self, temp_help_dir, sample_xml):
-        """Verify HelpID extraction with full format."""
-        indexer = HelpContentIndexer(temp_help_dir)
+    def test_help_id_extraction_formats(self, sample_xml_any_format):
+        """Verify HelpID extraction with full and abbreviated formats."""
+        indexer = HelpContentIndexer(sample_xml_any_format.parent)
         indexer.parse_xml_structure()
 
         # Check page with HelpID
         page = indexer.pages["x20di9371_page"]
         assert page.help_id == "12345"
 
-    def test_help_id_extraction_abbreviated_format(self, temp_help_dir, sample_xml_abbreviated):
-        """Verify HelpID extraction with abbreviated format."""
-        indexer = HelpContentIndexer(temp_help_dir)
-        indexer.parse_xml_structure()
-
-        # Check page with HelpID (abbreviated)
-        page = indexer.pages["x20di9371_page"]
-        assert page.help_id == "12345"
-
     def test_help_id_mapping(self, temp_help_dir, sample_xml):
         """Verify help_id_map is populated correctly."""
         indexer = HelpContentIndexer(temp_help_dir)
@@ -128,7 +152,7 @@ class TestBreadcrumbComputation:
         assert breadcrumb[1].text == "mapp Motion"
         assert breadcrumb[2].text == "MC_BR_MoveAbsolute"
 
-    def test_breadcrumb_cycle_detection(self, temp_help_dir):
+    def test_breadcrumb_cycle_detection(self, mutable_help_dir):
         """Verify breadcrumb stops on cycle."""
         # Create XML with duplicate ID causing apparent cycle
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
@@ -141,10 +165,10 @@ class TestBreadcrumbComputation:
     </Section>
 </BrHelpContent>
 """
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         xml_path.write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         indexer.parse_xml_structure()
 
         # Breadcrumb should terminate without infinite loop
@@ -152,7 +176,7 @@ class TestBreadcrumbComputation:
         breadcrumb = indexer.get_breadcrumb("page2")
         assert len(breadcrumb) < 100  # Should not hit depth limit
 
-    def test_breadcrumb_depth_limit(self, temp_help_dir):
+    def test_breadcrumb_depth_limit(self, mutable_help_dir):
         """Verify breadcrumb stops at 100 levels."""
         # Create deeply nested hierarchy
         xml_parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<BrHelpContent>']
@@ -170,27 +194,27 @@ class TestBreadcrumbComputation:
         xml_parts.append("</BrHelpContent>")
         xml_content = "\n".join(xml_parts)
 
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         xml_path.write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         indexer.parse_xml_structure()
 
         # Breadcrumb should be limited to 100 levels
         breadcrumb = indexer.get_breadcrumb("s149")
         assert len(breadcrumb) < 150  # Should stop before reaching all 150 levels
 
-    def test_breadcrumb_missing_parent(self, temp_help_dir):
+    def test_breadcrumb_missing_parent(self, mutable_help_dir):
         """Verify breadcrumb handles missing parent gracefully."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
     <Page Id="orphan_page" Text="Orphan Page" File="orphan.html"/>
 </BrHelpContent>
 """
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         xml_path.write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         indexer.parse_xml_structure()
 
         # Manually set invalid parent_id
@@ -265,7 +289,7 @@ class TestCategoryAndChildrenFunctions:
 class TestDuplicateIDHandling:
     """Test duplicate ID detection and handling."""
 
-    def test_duplicate_id_detection(self, temp_help_dir):
+    def test_duplicate_id_detection(self, mutable_help_dir):
         """Verify duplicate IDs are tracked in _duplicate_ids dict."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
@@ -273,10 +297,10 @@ class TestDuplicateIDHandling:
     <Section Id="dup_id" Text="Second Instance" File="second.html"/>
 </BrHelpContent>
 """
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         xml_path.write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         indexer.parse_xml_structure()
 
         # Check that duplicate was detected
@@ -285,7 +309,7 @@ class TestDuplicateIDHandling:
         assert "First Instance" in indexer._duplicate_ids["dup_id"]
         assert "Second Instance" in indexer._duplicate_ids["dup_id"]
 
-    def test_duplicate_id_does_not_crash(self, temp_help_dir):
+    def test_duplicate_id_does_not_crash(self, mutable_help_dir):
         """Verify parsing continues when duplicate IDs encountered."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
@@ -297,10 +321,10 @@ class TestDuplicateIDHandling:
     </Section>
 </BrHelpContent>
 """
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         xml_path.write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         # Should not raise exception
         indexer.parse_xml_structure()
 
@@ -308,7 +332,7 @@ class TestDuplicateIDHandling:
         assert "page1" in indexer.pages
         assert "page2" in indexer.pages
 
-    def test_duplicate_page_id_detection(self, temp_help_dir):
+    def test_duplicate_page_id_detection(self, mutable_help_dir):
         """Verify duplicate page IDs are tracked in _duplicate_ids dict."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
@@ -318,10 +342,10 @@ class TestDuplicateIDHandling:
     </Section>
 </BrHelpContent>
 """
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         xml_path.write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         indexer.parse_xml_structure()
 
         # Check that duplicate was detected
@@ -330,7 +354,7 @@ class TestDuplicateIDHandling:
         assert "First Page" in indexer._duplicate_ids["dup_page_id"]
         assert "Second Page" in indexer._duplicate_ids["dup_page_id"]
 
-    def test_duplicate_page_id_does_not_crash(self, temp_help_dir):
+    def test_duplicate_page_id_does_not_crash(self, mutable_help_dir):
         """Verify parsing continues when duplicate page IDs encountered."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
@@ -343,10 +367,10 @@ class TestDuplicateIDHandling:
     </Section>
 </BrHelpContent>
 """
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         xml_path.write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         # Should not raise exception
         indexer.parse_xml_structure()
 
@@ -361,9 +385,9 @@ class TestDuplicateIDHandling:
 class TestMetadataOperations:
     """Test metadata loading and saving."""
 
-    def test_needs_reindex_no_metadata(self, temp_help_dir, sample_xml):
+    def test_needs_reindex_no_metadata(self, mutable_help_dir):
         """Verify needs_reindex returns True when no metadata exists."""
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
 
         # Before parsing, no metadata exists
         assert indexer.needs_reindex() is True
@@ -378,18 +402,18 @@ class TestMetadataOperations:
         indexer2 = HelpContentIndexer(temp_help_dir)
         assert indexer2.needs_reindex() is False
 
-    def test_needs_reindex_hash_mismatch(self, temp_help_dir, sample_xml):
+    def test_needs_reindex_hash_mismatch(self, mutable_help_dir):
         """Verify needs_reindex returns True when hash differs."""
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         indexer.parse_xml_structure()
 
         # Modify XML file
-        xml_path = temp_help_dir / "brhelpcontent.xml"
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
         content = xml_path.read_text()
         xml_path.write_text(content + "\n<!-- modified -->", encoding="utf-8")
 
         # Create new indexer - should detect change
-        indexer2 = HelpContentIndexer(temp_help_dir)
+        indexer2 = HelpContentIndexer(mutable_help_dir)
         assert indexer2.needs_reindex() is True
 
     def test_save_metadata_content(self, temp_help_dir, sample_xml):
@@ -422,6 +446,80 @@ class TestMetadataOperations:
         assert len(hash1) == 32  # MD5 hash length
 
 
+class TestIncrementalUpdate:
+    """Test incremental re-parsing of changed XML."""
+
+    def test_incremental_update_no_changes(self, mutable_help_dir):
+        """Verify incremental_update returns nothing when XML is unchanged."""
+        indexer = HelpContentIndexer(mutable_help_dir)
+        indexer.parse_xml_structure()
+
+        changed, removed = indexer.incremental_update()
+
+        assert changed == []
+        assert removed == []
+
+    def test_incremental_update_detects_new_page(self, mutable_help_dir):
+        """Verify incremental_update reports a page added to the XML."""
+        indexer = HelpContentIndexer(mutable_help_dir)
+        indexer.parse_xml_structure()
+
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
+        content = xml_path.read_text()
+        new_page = '<Page Id="new_page" Text="New Page" File="new.html"/>'
+        content = content.replace("</BrHelpContent>", f"{new_page}</BrHelpContent>")
+        xml_path.write_text(content, encoding="utf-8")
+
+        changed, removed = indexer.incremental_update()
+
+        assert changed == ["new_page"]
+        assert removed == []
+        assert "new_page" in indexer.pages
+
+    def test_incremental_update_detects_changed_title(self, mutable_help_dir):
+        """Verify incremental_update reports a page whose attributes changed."""
+        indexer = HelpContentIndexer(mutable_help_dir)
+        indexer.parse_xml_structure()
+
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
+        content = xml_path.read_text()
+        xml_path.write_text(content.replace('Text="X20DI9371"', 'Text="X20DI9371 Renamed"'), encoding="utf-8")
+
+        changed, _removed = indexer.incremental_update()
+
+        assert changed == ["x20di9371_page"]
+        assert indexer.pages["x20di9371_page"].text == "X20DI9371 Renamed"
+
+    def test_incremental_update_detects_removed_page(self, mutable_help_dir):
+        """Verify incremental_update reports a page removed from the XML."""
+        indexer = HelpContentIndexer(mutable_help_dir)
+        indexer.parse_xml_structure()
+
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
+        content = xml_path.read_text()
+        start = content.index('<Page Id="x20di9371_page"')
+        end = content.index("</Page>", start) + len("</Page>")
+        xml_path.write_text(content[:start] + content[end:], encoding="utf-8")
+
+        _changed, removed = indexer.incremental_update()
+
+        assert removed == ["x20di9371_page"]
+        assert "x20di9371_page" not in indexer.pages
+
+    def test_incremental_update_refreshes_metadata(self, mutable_help_dir):
+        """Verify incremental_update updates the stored XML hash."""
+        indexer = HelpContentIndexer(mutable_help_dir)
+        indexer.parse_xml_structure()
+
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
+        content = xml_path.read_text()
+        xml_path.write_text(content + "\n<!-- modified -->", encoding="utf-8")
+
+        assert indexer.needs_reindex() is True
+        indexer.incremental_update()
+        assert indexer.needs_reindex() is False
+
+
 class TestContentExtraction:
     """Test HTML and plain text extraction."""
 
@@ -472,7 +570,7 @@ class TestContentExtraction:
         assert "<" not in text
         assert ">" not in text
 
-    def test_extract_plain_text_removes_script_style(self, temp_help_dir):
+    def test_extract_plain_text_removes_script_style(self, mutable_help_dir):
         """Verify script and style tags are removed."""
         # Create HTML with script/style
         html_content = """<html>
@@ -486,16 +584,16 @@ class TestContentExtraction:
 </body>
 </html>"""
 
-        (temp_help_dir / "test.html").write_text(html_content, encoding="utf-8")
+        (mutable_help_dir / "test.html").write_text(html_content, encoding="utf-8")
 
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
     <Page Id="test_page" Text="Test" File="test.html"/>
 </BrHelpContent>
 """
-        (temp_help_dir / "brhelpcontent.xml").write_text(xml_content, encoding="utf-8")
+        (mutable_help_dir / "brhelpcontent.xml").write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         indexer.parse_xml_structure()
 
         text = indexer.extract_plain_text("test_page")
@@ -522,16 +620,16 @@ class TestContentExtraction:
         # Verify it was NOT cached
         assert page.plain_text is None
 
-    def test_extract_content_file_not_found(self, temp_help_dir):
+    def test_extract_content_file_not_found(self, mutable_help_dir):
         """Verify graceful handling of missing HTML files."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <BrHelpContent>
     <Page Id="missing_page" Text="Missing" File="nonexistent.html"/>
 </BrHelpContent>
 """
-        (temp_help_dir / "brhelpcontent.xml").write_text(xml_content, encoding="utf-8")
+        (mutable_help_dir / "brhelpcontent.xml").write_text(xml_content, encoding="utf-8")
 
-        indexer = HelpContentIndexer(temp_help_dir)
+        indexer = HelpContentIndexer(mutable_help_dir)
         indexer.parse_xml_structure()
 
         # Should return None without crashing
@@ -5,6 +5,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from src.indexer import HelpContentIndexer
 from src.search_engine import HelpSearchEngine
 
 
@@ -12,10 +13,9 @@ class TestQuerySanitization:
     """Test query sanitization for FTS5 compatibility."""
 
     @pytest.fixture
-    def search_engine_with_data(self, initialized_indexer, tmp_path):
-        """Create search engine with sample data."""
-        db_path = tmp_path / "test.db"
-        engine = HelpSearchEngine(db_path, initialized_indexer, force_rebuild=True)
+    def search_engine_with_data(self, initialized_indexer):
+        """Create search engine with sample data (in-memory, no disk I/O)."""
+        engine = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
         yield engine
         engine.close()
 
@@ -63,10 +63,9 @@ class TestEnhancedQueryBuilding:
     """Test enhanced FTS5 query building."""
 
     @pytest.fixture
-    def search_engine_with_data(self, initialized_indexer, tmp_path):
-        """Create search engine with sample data."""
-        db_path = tmp_path / "test.db"
-        engine = HelpSearchEngine(db_path, initialized_indexer, force_rebuild=True)
+    def search_engine_with_data(self, initialized_indexer):
+        """Create search engine with sample data (in-memory, no disk I/O)."""
+        engine = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
         yield engine
         engine.close()
 
@@ -94,10 +93,9 @@ class TestCategoryFiltering:
     """Test category filtering in search."""
 
     @pytest.fixture
-    def search_engine_with_data(self, initialized_indexer, tmp_path):
-        """Create search engine with sample data."""
-        db_path = tmp_path / "test.db"
-        engine = HelpSearchEngine(db_path, initialized_indexer, force_rebuild=True)
+    def search_engine_with_data(self, initialized_indexer):
+        """Create search engine with sample data (in-memory, no disk I/O)."""
+        engine = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
         yield engine
         engine.close()
 
@@ -126,10 +124,9 @@ class TestResultMapping:
     """Test search result structure and field mapping."""
 
     @pytest.fixture
-    def search_engine_with_data(self, initialized_indexer, tmp_path):
-        """Create search engine with sample data."""
-        db_path = tmp_path / "test.db"
-        engine = HelpSearchEngine(db_path, initialized_indexer, force_rebuild=True)
+    def search_engine_with_data(self, initialized_indexer):
+        """Create search engine with sample data (in-memory, no disk I/O)."""
+        engine = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
         yield engine
         engine.close()
 
@@ -179,10 +176,9 @@ class TestErrorHandling:
     """Test error handling in search operations."""
 
     @pytest.fixture
-    def search_engine_with_data(self, initialized_indexer, tmp_path):
-        """Create search engine with sample data."""
-        db_path = tmp_path / "test.db"
-        engine = HelpSearchEngine(db_path, initialized_indexer, force_rebuild=True)
+    def search_engine_with_data(self, initialized_indexer):
+        """Create search engine with sample data (in-memory, no disk I/O)."""
+        engine = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
         yield engine
         engine.close()
 
@@ -198,10 +194,9 @@ class TestExtractTextForPage:
     """Test _extract_text_for_page helper method."""
 
     @pytest.fixture
-    def search_engine_with_data(self, initialized_indexer, tmp_path):
-        """Create search engine with sample data."""
-        db_path = tmp_path / "test.db"
-        engine = HelpSearchEngine(db_path, initialized_indexer, force_rebuild=True)
+    def search_engine_with_data(self, initialized_indexer):
+        """Create search engine with sample data (in-memory, no disk I/O)."""
+        engine = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
         yield engine
         engine.close()
 
@@ -330,6 +325,25 @@ class TestIndexBuildAndLoad:
             # Note: _needs_reindex is called in __init__, engine would rebuild
             engine2.close()
 
+    def test_detect_hash_mismatch(self, initialized_indexer, tmp_path):
+        """Verify detect_hash_mismatch compares stored vs current XML hash."""
+        db_path = tmp_path / "test.db"
+        HelpSearchEngine(db_path, initialized_indexer, force_rebuild=True).close()
+
+        # Fresh index matches the indexer that built it
+        assert HelpSearchEngine.detect_hash_mismatch(db_path, initialized_indexer) is False
+
+        # A changed XML hash is reported as stale - no engine is built
+        with patch.object(initialized_indexer, "_get_xml_hash", return_value="different_hash"):
+            assert HelpSearchEngine.detect_hash_mismatch(db_path, initialized_indexer) is True
+
+    def test_detect_hash_mismatch_missing_db(self, initialized_indexer, tmp_path):
+        """Verify a missing database is stale and is not created as a side effect."""
+        db_path = tmp_path / "does_not_exist.db"
+
+        assert HelpSearchEngine.detect_hash_mismatch(db_path, initialized_indexer) is True
+        assert not db_path.exists()
+
     def test_load_index_without_rebuild(self, initialized_indexer, tmp_path):
         """Verify index can be loaded without rebuilding."""
         db_path = tmp_path / "test.db"
@@ -407,15 +421,46 @@ class TestDatabaseConnection:
         engine.__del__()
         # Connection should be closed now
 
+    def test_in_memory_database(self, initialized_indexer, tmp_path):
+        """Verify ':memory:' and None create a working in-memory engine."""
+        engine = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
+        assert engine.in_memory is True
+        assert engine.db_path is None
+        assert len(engine.search("motion")) > 0
+        # No database file should have been written anywhere under tmp_path
+        assert list(tmp_path.iterdir()) == []
+        engine.close()
+
+        engine = HelpSearchEngine(None, initialized_indexer, force_rebuild=True)
+        assert engine.in_memory is True
+        assert len(engine.search("motion")) > 0
+        engine.close()
+
+    def test_from_connection_serves_backed_up_index(self, initialized_indexer):
+        """Verify from_connection wraps a connection filled via backup()."""
+        template = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
+
+        clone_conn = sqlite3.connect(":memory:", check_same_thread=False)
+        template.conn.backup(clone_conn)
+        clone = HelpSearchEngine.from_connection(clone_conn, initialized_indexer)
+
+        assert clone.in_memory is True
+        assert clone.db_path is None
+        assert len(clone.search("motion")) > 0
+
+        # The clone is independent of the template it was copied from
+        template.close()
+        assert len(clone.search("X20DI9371")) > 0
+        clone.close()
+
 
 class TestSearchLimits:
     """Test search result limiting."""
 
     @pytest.fixture
-    def search_engine_with_data(self, initialized_indexer, tmp_path):
-        """Create search engine with sample data."""
-        db_path = tmp_path / "test.db"
-        engine = HelpSearchEngine(db_path, initialized_indexer, force_rebuild=True)
+    def search_engine_with_data(self, initialized_indexer):
+        """Create search engine with sample data (in-memory, no disk I/O)."""
+        engine = HelpSearchEngine(":memory:", initialized_indexer, force_rebuild=True)
         yield engine
         engine.close()
 
@@ -428,3 +473,73 @@ class TestSearchLimits:
         # Search with limit=5
         results = search_engine_with_data.search("motion", limit=5)
         assert len(results) <= 5
+
+
+class TestUpsert:
+    """Test single-page index updates."""
+
+    @pytest.fixture
+    def search_system(self, mutable_help_dir, tmp_path):
+        """Create an indexer + search engine pair over mutable help content."""
+        indexer = HelpContentIndexer(mutable_help_dir)
+        indexer.parse_xml_structure()
+        engine = HelpSearchEngine(tmp_path / "test.db", indexer, force_rebuild=True)
+        yield indexer, engine
+        engine.close()
+
+    def test_upsert_indexes_new_page(self, search_system, mutable_help_dir):
+        """Verify upsert makes a newly added page searchable."""
+        indexer, engine = search_system
+
+        (mutable_help_dir / "new.html").write_text(
+            "<html><body><h1>Upserted Page</h1><p>Fresh content.</p></body></html>",
+            encoding="utf-8",
+        )
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
+        content = xml_path.read_text()
+        new_page = '<Page Id="new_page" Text="Upserted Page" File="new.html"/>'
+        xml_path.write_text(content.replace("</BrHelpContent>", f"{new_page}</BrHelpContent>"), encoding="utf-8")
+
+        changed, _removed = indexer.incremental_update()
+        assert changed == ["new_page"]
+
+        engine.upsert(indexer.pages["new_page"])
+
+        results = engine.search("Upserted")
+        assert any(r["page_id"] == "new_page" for r in results)
+
+    def test_upsert_replaces_existing_row(self, search_system):
+        """Verify upserting the same page twice doesn't duplicate it."""
+        indexer, engine = search_system
+
+        page = indexer.pages["x20di9371_page"]
+        engine.upsert(page)
+        engine.upsert(page)
+
+        cursor = engine.conn.execute("SELECT COUNT(*) FROM help_fts WHERE page_id = ?", (page.id,))
+        assert cursor.fetchone()[0] == 1
+
+    def test_upsert_refreshes_stored_hash(self, search_system, mutable_help_dir):
+        """Verify upsert syncs index metadata so reopening skips a rebuild."""
+        indexer, engine = search_system
+
+        xml_path = mutable_help_dir / "brhelpcontent.xml"
+        content = xml_path.read_text()
+        xml_path.write_text(content.replace('Text="X20DI9371"', 'Text="X20DI9371 Renamed"'), encoding="utf-8")
+
+        changed, _removed = indexer.incremental_update()
+        for page_id in changed:
+            engine.upsert(indexer.pages[page_id])
+
+        assert engine._needs_reindex() is False
+
+    def test_delete_removes_page_from_index(self, search_system):
+        """Verify delete purges a page's FTS row so it stops matching."""
+        indexer, engine = search_system
+
+        page_id = "x20di9371_page"
+        assert any(r["page_id"] == page_id for r in engine.search("X20DI9371"))
+
+        engine.delete(page_id)
+
+        assert not any(r["page_id"] == page_id for r in engine.search("X20DI9371"))
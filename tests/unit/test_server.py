@@ -7,6 +7,8 @@ import pytest
 
 from src.server import (
     AppContext,
+    _app_context_var,
+    _get_app_context,
     browse_section,
     get_as_version_config,
     get_breadcrumb,
@@ -507,3 +509,59 @@ class TestResourceHandlers:
         result = get_page_html(page_id="nonexistent", ctx=mock_context)
 
         assert result == "Page not found: nonexistent"
+
+
+class TestAppContextResolution:
+    """Test AppContext resolution via _get_app_context."""
+
+    def test_resolves_from_request_context(self, mock_indexer):
+        """Verify a Context-like object with request_context is used directly."""
+        app_context = AppContext(
+            indexer=mock_indexer,
+            search_engine=MagicMock(),
+            as_version="4",
+            online_help_base_url="https://help.br-automation.com/#/en/4/",
+        )
+        ctx = MagicMock()
+        ctx.request_context.lifespan_context = app_context
+
+        assert _get_app_context(ctx) is app_context
+
+    def test_resolves_app_context_passed_directly(self, mock_indexer):
+        """Verify an AppContext instance is accepted as-is."""
+        app_context = AppContext(
+            indexer=mock_indexer,
+            search_engine=MagicMock(),
+            as_version="4",
+            online_help_base_url="https://help.br-automation.com/#/en/4/",
+        )
+
+        assert _get_app_context(app_context) is app_context
+
+    def test_resolves_from_context_var(self, mock_indexer):
+        """Verify tools fall back to the ContextVar when ctx is None."""
+        app_context = AppContext(
+            indexer=mock_indexer,
+            search_engine=MagicMock(),
+            as_version="4",
+            online_help_base_url="https://help.br-automation.com/#/en/4/",
+        )
+
+        mock_indexer.get_top_level_categories.return_value = []
+
+        token = _app_context_var.set(app_context)
+        try:
+            assert _get_app_context(None) is app_context
+            result = get_categories(None)
+            assert result.total == 0
+        finally:
+            _app_context_var.reset(token)
+
+    def test_raises_without_any_context(self):
+        """Verify a clear error when no context source is available."""
+        token = _app_context_var.set(None)
+        try:
+            with pytest.raises(RuntimeError, match="No AppContext available"):
+                _get_app_context(None)
+        finally:
+            _app_context_var.reset(token)